@@ -240,11 +240,32 @@ def studio_view():
                         
                         prog = st.progress(0, text="🚀 Waking up AI...")
                         from app.services.content_engine import ContentEngine
-                        eng = ContentEngine(gemini_key=active_gemini, groq_key=active_groq, provider=provider)
+                        from app.services.quote_index import QuoteIndex, get_quote_index
+
+                        # Per-user memory of past quotes (guests get one per browser session)
+                        if current_user:
+                            def load_history():
+                                db = database.SessionLocal()
+                                rows = crud.get_quote_history(db, current_user.id)
+                                db.close()
+                                return rows
+                            q_index = get_quote_index(f"user:{current_user.id}", load_history)
+                        else:
+                            # Lives and dies with the session, so guests never accumulate in the process
+                            if 'guest_quote_index' not in st.session_state:
+                                st.session_state['guest_quote_index'] = QuoteIndex()
+                            q_index = st.session_state['guest_quote_index']
+
+                        eng = ContentEngine(gemini_key=active_gemini, groq_key=active_groq, provider=provider, quote_index=q_index)
                         
                         prog.progress(40, text="🧠 Brainstorming...")
                         idea, err = eng.generate_idea(i_per, i_tone)
                         
+                        if idea and current_user:
+                            db = database.SessionLocal()
+                            crud.add_quote_history(db, current_user.id, idea['quote'], idea.get('topic'), idea.get('language'))
+                            db.close()
+
                         if idea:
                             st.session_state['current_idea'] = idea
                             # Clean slate for new render
@@ -278,12 +299,18 @@ def studio_view():
             with c_info1: st.info(f"**Quote:** \"{idea['quote']}\"")
             with c_info2: st.caption(f"**Visual:** {idea['visual_search_term']}")
 
-            cols = st.columns(3)
+            from app.services.video_engine import VideoEngine
+            format_names = VideoEngine(None).get_format_names()
+            export_formats = st.multiselect("Export Formats", format_names,
+                                            default=["Reel 9:16", "Feed 4:5", "Square 1:1"])
+
+            cols = st.columns(4)
             do_render = cols[0].button("▶️ Render Video", use_container_width=True, type="primary")
             do_swap = cols[1].button("🔄 Swap Background", use_container_width=True)
             do_style = cols[2].button("🎨 Change Font", use_container_width=True)
+            do_export = cols[3].button("📐 Export Formats", use_container_width=True, disabled=not export_formats)
 
-            if do_render or do_swap or do_style:
+            if do_render or do_swap or do_style or do_export:
                 # PEXELS KEY LOGIC
                 active_pexels = current_user.pexels_api_key if current_user and current_user.pexels_api_key else SYSTEM_PEXELS
                 
@@ -291,7 +318,6 @@ def studio_view():
                     st.error("⚠️ System Error: Pexels API Key missing.")
                 else:
                     bar = st.progress(0, text="Initializing...")
-                    from app.services.video_engine import VideoEngine
                     v_eng = VideoEngine(active_pexels)
                     
                     # 1. Background
@@ -311,7 +337,24 @@ def studio_view():
                     st.session_state['current_style'] = curr
 
                     # 3. Render
-                    if 'bg_video_path' in st.session_state:
+                    if 'bg_video_path' in st.session_state and do_export:
+                        outputs = v_eng.create_multi_format(
+                            st.session_state['bg_video_path'],
+                            idea['quote'],
+                            format_names=export_formats,
+                            style_name=curr,
+                            progress_bar=bar
+                        )
+                        if outputs:
+                            st.session_state['format_exports'] = outputs
+                            st.session_state['final_video'] = next(iter(outputs.values()))
+                            st.session_state.pop('silent_video', None)
+                            bar.empty()
+                            st.toast("Export Complete!", icon="✅")
+                        else:
+                            st.error("Export Failed (Memory/Error)")
+                    elif 'bg_video_path' in st.session_state:
+                        st.session_state.pop('format_exports', None)
                         path = v_eng.create_video(
                             st.session_state['bg_video_path'], 
                             idea['quote'], 
@@ -320,6 +363,7 @@ def studio_view():
                         )
                         if path:
                             st.session_state['final_video'] = path
+                            st.session_state.pop('silent_video', None)
                             bar.empty()
                             st.toast("Render Complete!", icon="✅")
                         else:
@@ -339,6 +383,38 @@ def studio_view():
                 except:
                     st.warning("Video file expired. Please render again.")
 
+                # SOUNDTRACK (stream-copied onto the rendered reel, no re-render)
+                track = st.file_uploader("🎵 Voice-Over / Music", type=["mp3", "wav", "m4a", "aac", "ogg"])
+                loop_track = st.checkbox("Loop to fit reel", value=True)
+                if track and st.button("🎵 Add Audio", use_container_width=True):
+                    from app.services.audio_engine import AudioEngine
+                    a_eng = AudioEngine()
+                    track_path = os.path.join("assets/temp", "soundtrack" + os.path.splitext(track.name)[1])
+                    with open(track_path, 'wb') as f:
+                        f.write(track.getbuffer())
+
+                    # Always mux onto the silent render so swapping tracks doesn't stack audio
+                    silent = st.session_state.get('silent_video') or st.session_state['final_video']
+                    out = a_eng.add_audio(silent, track_path, loop=loop_track)
+                    if out:
+                        st.session_state['silent_video'] = silent
+                        st.session_state['final_video'] = out
+                        st.toast("Audio Added!", icon="🎵")
+                        st.rerun()
+                    else:
+                        st.error("Adding audio failed.")
+
+            # EXTRA FORMATS
+            if st.session_state.get('format_exports'):
+                st.caption("All Formats:")
+                fcols = st.columns(len(st.session_state['format_exports']))
+                for fcol, (name, fpath) in zip(fcols, st.session_state['format_exports'].items()):
+                    try:
+                        with open(fpath, 'rb') as f:
+                            fcol.download_button(f"⬇️ {name}", f.read(), os.path.basename(fpath), "video/mp4", use_container_width=True)
+                    except:
+                        fcol.warning(f"{name} expired.")
+
 # --- ROUTER ---
 check_auto_login()
 
@@ -36,4 +36,14 @@ def update_user(db: Session, user_id, persona, tone, visual, g_key, groq_key, p_
         
         db.commit()
         db.refresh(db_user)
-    return db_user
\ No newline at end of file
+    return db_user
+
+def get_quote_history(db: Session, user_id):
+    rows = db.query(models.QuoteHistory).filter(models.QuoteHistory.user_id == user_id).all()
+    return [(r.quote, r.topic, r.language) for r in rows]
+
+def add_quote_history(db: Session, user_id, quote, topic=None, language=None):
+    db_quote = models.QuoteHistory(user_id=user_id, quote=quote, topic=topic, language=language)
+    db.add(db_quote)
+    db.commit()
+    return db_quote
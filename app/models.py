@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Text
+from sqlalchemy import Column, Integer, String, Boolean, Text, ForeignKey
 from .database import Base
 
 class UserProfile(Base):
@@ -26,4 +26,13 @@ class UserProfile(Base):
     # Preferences
     ai_provider = Column(String, default="Groq")
 
-    is_active = Column(Boolean, default=True)
\ No newline at end of file
+    is_active = Column(Boolean, default=True)
+
+class QuoteHistory(Base):
+    __tablename__ = "quote_history"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("profiles.id"), index=True)
+    quote = Column(Text)
+    topic = Column(String, nullable=True)
+    language = Column(String, nullable=True)
@@ -0,0 +1,114 @@
+import os
+import time
+import hashlib
+import subprocess
+from moviepy.config import get_setting
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+# Cache limits: entries unused for longer than this are dropped, then the least recently
+# used ones until the folder fits the size cap
+CACHE_MAX_AGE = 7 * 24 * 3600
+CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+class AudioEngine:
+    """Attaches voice-overs / music beds to rendered reels without re-encoding the video stream."""
+
+    def __init__(self):
+        self.ffmpeg = get_setting("FFMPEG_BINARY")
+        self.cache_dir = "assets/temp/audio_cache"
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _run(self, cmd):
+        subprocess.run([self.ffmpeg, "-y", "-loglevel", "error"] + cmd, check=True, capture_output=True)
+
+    def _source_hash(self, audio_path):
+        h = hashlib.sha1()
+        with open(audio_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def prepare_audio(self, audio_path, duration, loop=False, volume=1.0, fade_out=1.0):
+        """Encodes the source to AAC trimmed/faded to `duration`. Results are cached per source + settings."""
+        key = f"{self._source_hash(audio_path)}|{duration:.3f}|{loop}|{volume}|{fade_out}"
+        cached = os.path.join(self.cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".m4a")
+        if os.path.exists(cached):
+            os.utime(cached)   # mark as recently used for pruning
+            return cached
+
+        # Without looping a short track ends before the reel does, so fade at its own end
+        length = duration
+        if not loop:
+            source_duration = ffmpeg_parse_infos(audio_path).get('duration')
+            if source_duration:
+                length = min(duration, source_duration)
+
+        filters = [f"volume={volume}"]
+        if fade_out > 0:
+            fade = min(fade_out, length)
+            filters.append(f"afade=t=out:st={max(0, length - fade):.3f}:d={fade:.3f}")
+
+        cmd = ["-stream_loop", "-1"] if loop else []
+        cmd += [
+            "-i", audio_path,
+            "-t", f"{duration:.3f}",
+            "-vn",
+            "-af", ",".join(filters),
+            "-c:a", "aac", "-b:a", "128k",
+            # Write to a temp name so a failed encode never poisons the cache
+            "-f", "mp4", cached + ".part"
+        ]
+        self._run(cmd)
+        os.replace(cached + ".part", cached)
+        self.prune_cache()
+        return cached
+
+    def prune_cache(self):
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".part"):
+                continue   # another session may still be encoding it
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+                if now - st.st_mtime > CACHE_MAX_AGE:
+                    os.remove(path)
+                else:
+                    entries.append((st.st_mtime, st.st_size, path))
+            except OSError:
+                continue
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= CACHE_MAX_BYTES:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def add_audio(self, video_path, audio_path, output_path=None, loop=False, volume=1.0, fade_out=1.0):
+        """Muxes `audio_path` onto an encoded reel. The video stream is copied as-is."""
+        try:
+            duration = ffmpeg_parse_infos(video_path)['duration']
+            audio = self.prepare_audio(audio_path, duration, loop=loop, volume=volume, fade_out=fade_out)
+
+            if not output_path:
+                base, ext = os.path.splitext(video_path)
+                output_path = f"{base}_audio{ext}"
+
+            self._run([
+                "-i", video_path,
+                "-i", audio,
+                "-map", "0:v:0", "-map", "1:a:0",
+                "-c", "copy",
+                "-movflags", "+faststart",
+                output_path
+            ])
+            return output_path
+
+        except Exception as e:
+            print(f"❌ Error Adding Audio: {e}")
+            return None
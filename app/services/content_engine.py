@@ -3,12 +3,29 @@ from groq import Groq
 import json
 import random
 import time
+from .model_health import model_health, backoff_delay, classify_error, CallerError, BadOutputError, OK, CALLER
+
+# Fallback queues in order of preference (quality first); model_health only demotes
+# models whose breaker is open or that are clearly degraded
+GROQ_MODELS = [
+    "llama-3.3-70b-versatile",
+    "llama-3.1-8b-instant"
+]
+
+GEMINI_MODELS = [
+    "gemini-2.0-flash",
+    "gemini-1.5-flash",
+    "gemini-pro"
+]
 
 class ContentEngine:
-    def __init__(self, gemini_key=None, groq_key=None, provider="Groq"):
+    def __init__(self, gemini_key=None, groq_key=None, provider="Groq", quote_index=None, max_attempts=3):
         self.gemini_key = gemini_key
         self.groq_key = groq_key
         self.provider = provider
+        # Optional per-user QuoteIndex: near-repeats are regenerated before they reach rendering
+        self.quote_index = quote_index
+        self.max_attempts = max_attempts
 
     def generate_idea(self, persona, tone, language="English"):
         print(f"🧠 Brain: Generating concept using {self.provider}...")
@@ -21,12 +38,33 @@ class ContentEngine:
             "Betrayal by friends", "The rat race", "Finding God in nature", 
             "Why we fear death", "The beauty of pain", "Lost dreams"
         ]
-        selected_topic = random.choice(topics)
         
         # 2. SELECT LANGUAGE
         # If the input language is "English", we might still randomize for variety
         # or stick to the user's preference. For now, let's mix it up as requested previously.
-        selected_lang = random.choice(["English", "Hindi", "Marathi"])
+        languages = ["English", "Hindi", "Marathi"]
+
+        if self.quote_index is None:
+            return self._generate_once(persona, tone, random.choice(topics), random.choice(languages))
+
+        data, err = None, None
+        for attempt in range(self.max_attempts):
+            # Lean towards topic/language combinations this user hasn't had yet
+            selected_topic, selected_lang = self.quote_index.pick_combo(topics, languages)
+            data, err = self._generate_once(persona, tone, selected_topic, selected_lang)
+            if not data:
+                return data, err
+
+            if self.quote_index.add_if_new(data.get('quote', ''), selected_topic, selected_lang):
+                return data, None
+
+            print(f"♻️ Near-duplicate quote, regenerating ({attempt + 1}/{self.max_attempts})...")
+            # Count the combo as used so the next pick moves away from it
+            self.quote_index.mark_used(selected_topic, selected_lang)
+
+        return None, "Could not generate a fresh quote. Please try again."
+
+    def _generate_once(self, persona, tone, selected_topic, selected_lang):
         print(f"🌍 Language: {selected_lang} | Topic: {selected_topic}")
 
         # 3. THE PROMPT
@@ -55,9 +93,60 @@ class ContentEngine:
 
         # 4. ROUTING LOGIC
         if self.provider == "Groq":
-            return self._generate_with_groq(prompt, selected_lang)
+            data, err = self._generate_with_groq(prompt, selected_lang)
         else:
-            return self._generate_with_gemini(prompt, selected_lang)
+            data, err = self._generate_with_gemini(prompt, selected_lang)
+
+        if data:
+            data['topic'] = selected_topic
+        return data, err
+
+    # --- FALLBACK RUNNER ---
+    def _run_with_fallback(self, provider, models, call, lang):
+        """Tries `call(model_name)` across models ordered by live health; returns (data, error)."""
+        queue = model_health.candidates(provider, models)
+        if not queue:
+            wait = model_health.next_retry_in(provider, models)
+            return None, f"{provider} Error: all models are cooling down, retry in {int(wait) + 1}s."
+
+        last_error = ""
+        failures = 0
+
+        for model_name in queue:
+            if not model_health.begin(provider, model_name):
+                # Another session is already probing this model
+                continue
+
+            # Recorded outcome (OK / FAULT / BAD_OUTPUT); None (caller-side error or an
+            # interrupted call) only frees the probe slot
+            outcome = None
+            start = time.monotonic()
+            try:
+                if failures:
+                    time.sleep(backoff_delay(failures - 1))
+                start = time.monotonic()
+
+                data = call(model_name)
+                if not isinstance(data, dict):
+                    raise BadOutputError("model returned JSON that is not an object")
+                data['language'] = lang
+                outcome = OK
+            except Exception as e:
+                last_error = str(e)
+                failures += 1
+                kind = classify_error(e)
+                if kind != CALLER:
+                    outcome = kind
+            finally:
+                if outcome is None:
+                    model_health.release(provider, model_name)
+                else:
+                    model_health.record(provider, model_name, outcome, time.monotonic() - start)
+
+            if outcome == OK:
+                return data, None
+
+        return None, f"{provider} Error: {last_error or 'no model available'}"
 
     # --- ENGINE 1: GROQ ---
     def _generate_with_groq(self, prompt, lang):
@@ -66,8 +155,12 @@ class ContentEngine:
         
         try:
             client = Groq(api_key=self.groq_key)
+        except Exception as e:
+            return None, f"Groq Error: {str(e)}"
+
+        def call(model_name):
             completion = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
+                model=model_name,
                 messages=[
                     {"role": "system", "content": "You are a JSON-only generator."},
                     {"role": "user", "content": prompt}
@@ -77,11 +170,11 @@ class ContentEngine:
                 response_format={"type": "json_object"}
             )
             response_text = completion.choices[0].message.content
-            data = json.loads(response_text)
-            data['language'] = lang
-            return data, None
-        except Exception as e:
-            return None, f"Groq Error: {str(e)}"
+            if not response_text:
+                raise CallerError("Groq returned an empty response")
+            return json.loads(response_text)
+
+        return self._run_with_fallback("Groq", GROQ_MODELS, call, lang)
 
     # --- ENGINE 2: GEMINI ---
     def _generate_with_gemini(self, prompt, lang):
@@ -89,31 +182,19 @@ class ContentEngine:
             return None, "Missing Gemini API Key."
             
         genai.configure(api_key=self.gemini_key)
-        
-        models_queue = [
-            "gemini-2.0-flash",
-            "gemini-1.5-flash",
-            "gemini-pro"
-        ]
 
-        last_error = ""
+        def call(model_name):
+            model = genai.GenerativeModel(model_name)
+            response = model.generate_content(
+                prompt, 
+                generation_config={"response_mime_type": "application/json"}
+            )
+            
+            # Safety-blocked prompts come back without candidate parts (response.text would raise)
+            if not response.candidates or not response.candidates[0].content.parts:
+                raise CallerError(f"Gemini blocked the request: {response.prompt_feedback}")
 
-        for model_name in models_queue:
-            try:
-                model = genai.GenerativeModel(model_name)
-                response = model.generate_content(
-                    prompt, 
-                    generation_config={"response_mime_type": "application/json"}
-                )
-                
-                clean_text = response.text.replace('```json', '').replace('```', '').strip()
-                data = json.loads(clean_text)
-                data['language'] = lang
-                return data, None
+            clean_text = response.text.replace('```json', '').replace('```', '').strip()
+            return json.loads(clean_text)
 
-            except Exception as e:
-                last_error = str(e)
-                time.sleep(1)
-                continue
-        
-        return None, f"Gemini Error: {last_error}"
\ No newline at end of file
+        return self._run_with_fallback("Gemini", GEMINI_MODELS, call, lang)
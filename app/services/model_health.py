@@ -0,0 +1,232 @@
+import json
+import random
+import threading
+import time
+from collections import deque
+
+# --- CIRCUIT BREAKER SETTINGS ---
+WINDOW_SIZE = 20            # rolling window of recent calls per model
+FAILURE_THRESHOLD = 3       # consecutive failures that trip the breaker
+MIN_SUCCESS_RATE = 0.5      # ...or success rate below this once we have MIN_SAMPLES
+MIN_SAMPLES = 5
+BASE_COOLDOWN = 15.0        # seconds before the first half-open probe
+MAX_COOLDOWN = 600.0        # cooldown doubles on every failed probe, up to this
+PROBE_LEASE = 60.0          # a half-open probe not reported back within this is considered lost
+
+# --- ORDERING ---
+# The configured model order is a quality preference and always wins, unless a model is
+# clearly degraded: low success rate or very slow. Degraded models go behind healthy ones.
+DEGRADED_SUCCESS_RATE = 0.8
+DEGRADED_LATENCY = 8.0      # seconds per successful call
+STALE_AFTER = 300.0         # a demoted model gets traffic again once its samples are this old
+
+# HTTP statuses caused by the caller (bad key, quota, malformed request), not the model
+CALLER_ERROR_STATUSES = {400, 401, 403, 429}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Call outcomes
+OK, FAULT, BAD_OUTPUT, CALLER = "ok", "fault", "bad_output", "caller"
+
+
+class CallerError(Exception):
+    """The request itself was refused (safety block, empty candidates): says nothing about the model."""
+
+
+class BadOutputError(ValueError):
+    """The model answered, but not with the JSON object we asked for."""
+
+
+def classify_error(exc):
+    """Maps an exception from a model call to FAULT, BAD_OUTPUT or CALLER.
+
+    Only FAULT (timeouts, 5xx, not found/deprecated, connection errors) counts towards
+    tripping the shared breaker. Auth, quota, bad-request and blocked-prompt errors depend
+    on the caller; unparseable output depends on the prompt/persona and is tracked apart.
+    """
+    if isinstance(exc, CallerError):
+        return CALLER
+    if isinstance(exc, (BadOutputError, json.JSONDecodeError)):
+        return BAD_OUTPUT
+    status = getattr(exc, 'status_code', None)
+    if not isinstance(status, int):
+        # google.api_core errors expose the HTTP status as `code`
+        status = getattr(exc, 'code', None)
+    if isinstance(status, int) and status in CALLER_ERROR_STATUSES:
+        return CALLER
+    return FAULT
+
+
+def backoff_delay(attempt, base=0.25, cap=4.0):
+    """Exponential backoff with full jitter: uniform(0, min(cap, base * 2^attempt))."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class ModelHealth:
+    def __init__(self):
+        self.calls = deque(maxlen=WINDOW_SIZE)   # (ok, latency_seconds)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.cooldown = BASE_COOLDOWN
+        self.opened_at = 0.0
+        self.probing = False
+        self.probe_started_at = 0.0
+        self.last_call_at = None
+        self.bad_outputs = 0
+
+    @property
+    def success_rate(self):
+        if not self.calls:
+            return 1.0
+        return sum(ok for ok, _ in self.calls) / len(self.calls)
+
+    @property
+    def avg_latency(self):
+        latencies = [lat for ok, lat in self.calls if ok]
+        return sum(latencies) / len(latencies) if latencies else None
+
+    def score(self):
+        """Lower is better: expected seconds per successful call."""
+        latency = self.avg_latency
+        if latency is None:
+            latency = DEGRADED_LATENCY
+        return latency / max(self.success_rate, 0.05)
+
+    def degraded(self, now):
+        if self.last_call_at is None or now - self.last_call_at > STALE_AFTER:
+            return False
+        if len(self.calls) >= MIN_SAMPLES and self.success_rate < DEGRADED_SUCCESS_RATE:
+            return True
+        latency = self.avg_latency
+        return latency is not None and latency > DEGRADED_LATENCY
+
+    def _probe_held(self, now):
+        return self.probing and now - self.probe_started_at < PROBE_LEASE
+
+    def retry_at(self):
+        if self.state == HALF_OPEN:
+            return self.probe_started_at + PROBE_LEASE if self.probing else 0.0
+        return self.opened_at + self.cooldown
+
+    def available(self, now):
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN:
+            return not self._probe_held(now)
+        return now >= self.retry_at()
+
+    def begin(self, now):
+        """Claims a call slot. In the half-open state only one probe is let through."""
+        if self.state == CLOSED:
+            return True
+        if not self.available(now):
+            return False
+        self.state = HALF_OPEN
+        self.probing = True
+        self.probe_started_at = now
+        return True
+
+    def release(self):
+        """Frees a half-open probe slot without counting the call for or against the model."""
+        self.probing = False
+
+    def record(self, outcome, latency, now):
+        if outcome == BAD_OUTPUT:
+            # The model is up; the output is prompt-dependent. Count it, don't trip on it.
+            self.bad_outputs += 1
+            self.last_call_at = now
+            self.release()
+            return
+
+        ok = outcome == OK
+        self.calls.append((ok, latency))
+        self.last_call_at = now
+        if ok:
+            self.consecutive_failures = 0
+            if self.state == HALF_OPEN:
+                # Probe succeeded: close and start with a clean window
+                self.state = CLOSED
+                self.probing = False
+                self.cooldown = BASE_COOLDOWN
+                self.calls.clear()
+                self.calls.append((ok, latency))
+            return
+
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN:
+            self.probing = False
+            self.cooldown = min(self.cooldown * 2, MAX_COOLDOWN)
+            self._trip(now)
+        elif self.state == CLOSED and (
+            self.consecutive_failures >= FAILURE_THRESHOLD
+            or (len(self.calls) >= MIN_SAMPLES and self.success_rate < MIN_SUCCESS_RATE)
+        ):
+            self._trip(now)
+
+    def _trip(self, now):
+        self.state = OPEN
+        self.opened_at = now
+
+
+class HealthRegistry:
+    """Health of every (provider, model) pair. One instance is shared by all sessions in the process."""
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _get(self, provider, model):
+        key = (provider, model)
+        if key not in self._models:
+            self._models[key] = ModelHealth()
+        return self._models[key]
+
+    def candidates(self, provider, models):
+        """Returns the models worth trying right now.
+
+        Healthy models keep their configured (preference) order. Degraded models follow,
+        fastest first, then half-open ones waiting for a probe. Open breakers are skipped.
+        """
+        now = time.monotonic()
+        with self._lock:
+            ranked = []
+            for i, model in enumerate(models):
+                h = self._get(provider, model)
+                if not h.available(now):
+                    continue
+                if h.state != CLOSED:
+                    ranked.append((2, h.score(), i, model))
+                elif h.degraded(now):
+                    ranked.append((1, h.score(), i, model))
+                else:
+                    ranked.append((0, 0, i, model))
+        return [model for *_, model in sorted(ranked)]
+
+    def next_retry_in(self, provider, models):
+        now = time.monotonic()
+        with self._lock:
+            waits = [self._get(provider, m).retry_at() - now for m in models]
+        return max(0.0, min(waits)) if waits else 0.0
+
+    def begin(self, provider, model):
+        with self._lock:
+            return self._get(provider, model).begin(time.monotonic())
+
+    def release(self, provider, model):
+        with self._lock:
+            self._get(provider, model).release()
+
+    def record(self, provider, model, outcome, latency):
+        with self._lock:
+            self._get(provider, model).record(outcome, latency, time.monotonic())
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                key: {"state": h.state, "success_rate": h.success_rate, "avg_latency": h.avg_latency,
+                      "bad_outputs": h.bad_outputs}
+                for key, h in self._models.items()
+            }
+
+
+model_health = HealthRegistry()
@@ -0,0 +1,160 @@
+import random
+import re
+import threading
+import unicodedata
+import zlib
+from collections import Counter
+import numpy as np
+
+# --- MINHASH / LSH SETTINGS ---
+# 32 hashes split into 16 bands of 2 rows. A pair becomes a candidate with probability
+# 1 - (1 - J^2)^16: ~0.999 at J=0.6 and ~0.99 at J=0.5, so recall at the duplicate
+# threshold is near-total. The extra false candidates are filtered by exact Jaccard.
+NUM_PERM = 32
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+DUPLICATE_THRESHOLD = 0.6
+
+# Multiply-shift hashing, h_i(x) = (a_i * x + b_i mod 2^64) >> 32 with odd a_i, computed for
+# all permutations at once; uint64 wrap-around is the "mod 2^64"
+_rng = np.random.default_rng(1337)
+_A = (_rng.integers(0, 1 << 63, size=(NUM_PERM, 1), dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+_B = _rng.integers(0, 1 << 63, size=(NUM_PERM, 1), dtype=np.uint64)
+_MAX_HASH = (1 << 32) - 1
+
+
+def normalize_quote(text):
+    """Lowercases and strips punctuation while keeping Devanagari vowel signs and viramas."""
+    text = unicodedata.normalize("NFC", text or "").lower()
+    # Keep letters (L*), combining marks (M*) and digits (N*); everything else becomes a space
+    chars = [c if unicodedata.category(c)[0] in "LMN" else " " for c in text]
+    return re.sub(r"\s+", " ", "".join(chars)).strip()
+
+
+def shingles(text, k=SHINGLE_SIZE):
+    text = normalize_quote(text)
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def minhash(shingle_set):
+    if not shingle_set:
+        return (_MAX_HASH,) * NUM_PERM
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingle_set), dtype=np.uint64, count=len(shingle_set))
+    with np.errstate(over='ignore'):
+        signature = ((_A * hashes + _B) >> np.uint64(32)).min(axis=1)
+    return tuple(signature.tolist())
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class QuoteIndex:
+    """Per-user memory of past quotes for near-duplicate checks and topic/language rotation."""
+
+    def __init__(self, threshold=DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._shingles = []
+        self._buckets = [{} for _ in range(BANDS)]
+        self._combo_counts = Counter()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._shingles)
+
+    def _bands(self, signature):
+        return [signature[i * ROWS:(i + 1) * ROWS] for i in range(BANDS)]
+
+    def _closest(self, sh, bands):
+        # Caller holds self._lock
+        candidates = set()
+        for band, bucket in zip(bands, self._buckets):
+            candidates.update(bucket.get(band, ()))
+        best = None
+        for idx in candidates:
+            score = jaccard(sh, self._shingles[idx])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (idx, score)
+        return best
+
+    def _insert(self, sh, bands):
+        # Caller holds self._lock
+        idx = len(self._shingles)
+        self._shingles.append(sh)
+        for band, bucket in zip(bands, self._buckets):
+            bucket.setdefault(band, []).append(idx)
+
+    def find_duplicate(self, quote):
+        """Returns (index, similarity) of the closest past quote above the threshold, else None."""
+        sh = shingles(quote)
+        if not sh:
+            return None
+        bands = self._bands(minhash(sh))
+        with self._lock:
+            return self._closest(sh, bands)
+
+    def is_duplicate(self, quote):
+        return self.find_duplicate(quote) is not None
+
+    def mark_used(self, topic, language):
+        with self._lock:
+            self._combo_counts[(topic, language)] += 1
+
+    def add(self, quote, topic=None, language=None):
+        if topic or language:
+            self.mark_used(topic, language)
+        sh = shingles(quote)
+        if not sh:
+            return
+        bands = self._bands(minhash(sh))
+        with self._lock:
+            self._insert(sh, bands)
+
+    def add_if_new(self, quote, topic=None, language=None):
+        """Checks and inserts under one lock, so concurrent sessions can't both accept a near-repeat.
+
+        Returns True if the quote was added, False if it is a near-duplicate.
+        """
+        sh = shingles(quote)
+        bands = self._bands(minhash(sh)) if sh else None
+        with self._lock:
+            if sh and self._closest(sh, bands) is not None:
+                return False
+            if sh:
+                self._insert(sh, bands)
+            if topic or language:
+                self._combo_counts[(topic, language)] += 1
+        return True
+
+    def pick_combo(self, topics, languages):
+        """Weighted random (topic, language), favouring combinations used least so far."""
+        combos = [(t, l) for t in topics for l in languages]
+        with self._lock:
+            weights = [1.0 / (1 + self._combo_counts[c]) ** 2 for c in combos]
+        return random.choices(combos, weights=weights, k=1)[0]
+
+
+# --- PROCESS-WIDE REGISTRY (registered users only; guests keep theirs in session state) ---
+_indexes = {}
+_registry_lock = threading.Lock()
+
+
+def get_quote_index(user_key, loader=None):
+    """Returns the index for a user. On first use `loader()` is called for (quote, topic, language) rows to seed it."""
+    with _registry_lock:
+        index = _indexes.get(user_key)
+    if index is not None:
+        return index
+
+    # Build outside the lock so one user's history query doesn't stall everyone else;
+    # if two sessions race, the first one stored wins
+    index = QuoteIndex()
+    for quote, topic, language in (loader() if loader else []):
+        index.add(quote, topic, language)
+    with _registry_lock:
+        return _indexes.setdefault(user_key, index)
@@ -1,6 +1,9 @@
 import os
+import queue
 import random
+import threading
 import requests
+import numpy as np
 import PIL.Image
 import textwrap
 from moviepy.config import change_settings
@@ -29,6 +32,7 @@ if not hasattr(PIL.Image, 'ANTIALIAS'):
     PIL.Image.ANTIALIAS = PIL.Image.LANCZOS
 
 from moviepy.editor import VideoFileClip, TextClip, CompositeVideoClip
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
 
 # --- CUSTOM LOGGER ---
 class StreamlitLogger(ProgressBarLogger):
@@ -67,9 +71,26 @@ class VideoEngine:
             {"name": "Neon Blue", "font": self.font_sans, "color": '#00FFFF', "stroke_color": '#000000', "stroke_width": 2, "fontsize": 50, "v_pos": 600}
         ]
 
+        # Export targets for fan-out rendering. Style sizes/positions are tuned for 720x1280
+        # and get scaled to each format.
+        self.formats = [
+            {"name": "Reel 9:16", "size": (720, 1280), "file": "final_reel.mp4"},
+            {"name": "Reel 1080p", "size": (1080, 1920), "file": "final_reel_1080p.mp4"},
+            {"name": "Feed 4:5", "size": (1080, 1350), "file": "final_feed_4x5.mp4"},
+            {"name": "Square 1:1", "size": (1080, 1080), "file": "final_square_1x1.mp4"}
+        ]
+
     def get_style_names(self):
         return [s['name'] for s in self.styles]
 
+    def get_format_names(self):
+        return [f['name'] for f in self.formats]
+
+    def _pick_style(self, style_name=None):
+        if style_name:
+            return next((s for s in self.styles if s['name'] == style_name), random.choice(self.styles))
+        return random.choice(self.styles)
+
     def get_stock_video(self, search_term, progress_bar=None):
         print(f"👀 Searching: {search_term}")
         headers = {"Authorization": self.api_key}
@@ -120,10 +141,7 @@ class VideoEngine:
             TARGET_H = 1280
             target_duration = random.randint(7, 10) 
             
-            if style_name:
-                style = next((s for s in self.styles if s['name'] == style_name), random.choice(self.styles))
-            else:
-                style = random.choice(self.styles)
+            style = self._pick_style(style_name)
             
             clip = VideoFileClip(video_path)
             
@@ -184,4 +202,159 @@ class VideoEngine:
             
         except Exception as e:
             print(f"❌ Error Editing: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    # --- MULTI-FORMAT EXPORT ---
+    def _build_caption(self, quote_text, style, size):
+        """Renders the caption once per format and returns (x, y, premultiplied_rgb, inverse_alpha)."""
+        W, H = size
+        scale = W / 720
+        wrapped_text = "\n".join(textwrap.wrap(quote_text, width=22))
+
+        margin = int(40 * scale)
+        fontsize = int(style["fontsize"] * scale)
+
+        # Shrink the font until the whole caption fits the format (long Devanagari quotes
+        # can run 5-6 lines, which overflows 1:1 at the 9:16 size)
+        while True:
+            txt_clip = TextClip(
+                wrapped_text,
+                fontsize=fontsize,
+                color=style["color"],
+                font=style["font"],
+                stroke_color=style["stroke_color"],
+                stroke_width=max(1, round(style["stroke_width"] * scale)),
+                size=(W - int(100 * scale), None),
+                method='caption'
+            )
+            if txt_clip.h <= H - 2 * margin or fontsize <= 20:
+                break
+            txt_clip.close()
+            fontsize = int(fontsize * 0.85)
+
+        rgb = txt_clip.get_frame(0).astype(np.float32)
+        alpha = txt_clip.mask.get_frame(0).astype(np.float32)[..., None]
+        txt_clip.close()
+
+        x = max(0, (W - rgb.shape[1]) // 2)
+        # Scaled style position, moved up if the caption would run past the bottom margin
+        y = max(0, min(int(style["v_pos"] * H / 1280), H - rgb.shape[0] - margin))
+        rgb, alpha = rgb[:H - y, :W - x], alpha[:H - y, :W - x]
+        return x, y, rgb * alpha, 1.0 - alpha
+
+    @staticmethod
+    def _fit_frame(frame, size):
+        """Center-crops a frame to the target aspect ratio, then scales it to the target size."""
+        h, w = frame.shape[:2]
+        tw, th = size
+        if w / h > tw / th:
+            cw = int(round(h * tw / th))
+            x1 = (w - cw) // 2
+            frame = frame[:, x1:x1 + cw]
+        else:
+            ch = int(round(w * th / tw))
+            y1 = (h - ch) // 2
+            frame = frame[y1:y1 + ch]
+        return np.array(PIL.Image.fromarray(frame).resize((tw, th), PIL.Image.BILINEAR))
+
+    def _encode_worker(self, fmt, caption, frames, writer, errors):
+        x, y, premult, inv_alpha = caption
+        h, w = premult.shape[:2]
+        failed = False
+        while True:
+            frame = frames.get()
+            if frame is None:
+                break
+            if failed:
+                # Keep draining so the decoder never blocks on a dead encoder
+                continue
+            try:
+                out = self._fit_frame(frame, fmt["size"])
+                region = out[y:y + h, x:x + w].astype(np.float32)
+                out[y:y + h, x:x + w] = (region * inv_alpha + premult).astype(np.uint8)
+                writer.write_frame(out)
+            except Exception as e:
+                errors[fmt["name"]] = e
+                failed = True
+
+    def create_multi_format(self, video_path, quote_text, format_names=None, style_name=None, progress_bar=None):
+        """Decodes the background once and encodes every requested format in parallel.
+
+        Returns a dict of format name -> output path, or None on failure.
+        """
+        clip = None
+        writers = []
+        queues = []
+        workers = []
+        try:
+            fps = 24
+            target_duration = random.randint(7, 10)
+            style = self._pick_style(style_name)
+
+            if format_names is None:
+                format_names = ["Reel 9:16", "Feed 4:5", "Square 1:1"]
+            formats = [f for f in self.formats if f['name'] in format_names]
+            if not formats:
+                print(f"❌ Error Editing: no known formats in {format_names}")
+                return None
+
+            clip = VideoFileClip(video_path)
+
+            # Decode no larger than the biggest target needs: each format cover-crops at
+            # max(tw/w, th/h), so keep the largest of those scales (never upscale)
+            scale = max(max(tw / clip.w, th / clip.h) for tw, th in (f["size"] for f in formats))
+            if scale < 1:
+                clip = clip.resize(height=int(round(clip.h * scale)))
+
+            if clip.duration < target_duration:
+                n_loops = int(target_duration / clip.duration) + 2
+                clip = clip.loop(n=n_loops)
+                clip = clip.set_duration(target_duration)
+            else:
+                clip = clip.subclip(0, target_duration)
+
+            outputs = {}
+            errors = {}
+            for fmt in formats:
+                output_path = os.path.join(self.assets_dir, fmt["file"])
+                caption = self._build_caption(quote_text, style, fmt["size"])
+                writer = FFMPEG_VideoWriter(output_path, fmt["size"], fps, codec='libx264', preset="medium", threads=2)
+                writers.append(writer)
+                frames = queue.Queue(maxsize=8)
+                queues.append(frames)
+                t = threading.Thread(target=self._encode_worker, args=(fmt, caption, frames, writer, errors), daemon=True)
+                t.start()
+                workers.append(t)
+                outputs[fmt["name"]] = output_path
+
+            n_frames = int(target_duration * fps)
+            for i, frame in enumerate(clip.iter_frames(fps=fps, dtype='uint8')):
+                for frames in queues:
+                    frames.put(frame)
+                if progress_bar and i % fps == 0:
+                    percentage = min(i / n_frames, 1)
+                    progress_bar.progress(int(50 + percentage * 50), text=f"🎬 Rendering {len(formats)} formats: {int(percentage*100)}%")
+
+            for frames in queues:
+                frames.put(None)
+            for t in workers:
+                t.join()
+
+            if errors:
+                raise RuntimeError("; ".join(f"{name}: {e}" for name, e in errors.items()))
+
+            return outputs
+
+        except Exception as e:
+            print(f"❌ Error Editing: {e}")
+            return None
+
+        finally:
+            for frames, t in zip(queues, workers):
+                if t.is_alive():
+                    frames.put(None)
+                    t.join()
+            for writer in writers:
+                writer.close()
+            if clip:
+                clip.close()